@@ -11,22 +11,33 @@ Usage:
 """
 
 import argparse
-import glob
-import io
+import asyncio
 import logging
 import os
+import queue
 import sys
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
 import cv2
 import geopandas as gpd
 import mercantile
+import numpy as np
 import requests
+import shapely
 import supervision as sv
-from inference import get_model
-from PIL import Image
-from shapely.geometry import box
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import aiohttp
+except ImportError:  # Fall back to the pooled requests session below
+    aiohttp = None
 
 # Logger
 logger = logging.getLogger(__name__)
@@ -35,29 +46,165 @@ logger = logging.getLogger(__name__)
 DEFAULT_TILE_URL = "https://services.arcgisonline.com/arcgis/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}"
 TILE_SIZE = 256
 STITCHED_SIZE = 512
+JPEG_QUALITY = 90
+DEFAULT_WORKERS = 8
+DEFAULT_BATCH_SIZE = 16
+PREFETCH_BATCHES = 2
+TILE_QUEUE_SIZE = 64
+DOWNLOAD_CHUNK_TILES = 64
+PREFETCH_CHUNKS = 2
+
+# ONNX Runtime execution providers for each --engine choice, in priority order.
+# Roboflow models run through ONNX Runtime; TensorRT builds and caches an
+# optimized FP16 engine on first use (the inference SDK always enables FP16
+# for TensorRT) and falls back to CUDA/CPU for unsupported ops. The cuda and
+# cpu engines run the exported FP32 weights.
+ENGINE_PROVIDERS = {
+    "cpu": ["CPUExecutionProvider"],
+    "cuda": ["CUDAExecutionProvider", "CPUExecutionProvider"],
+    "tensorrt": ["TensorrtExecutionProvider", "CUDAExecutionProvider", "CPUExecutionProvider"],
+}
+
+# Offsets of the 4 subtiles that make up one stitched image, in stitch order
+# (top-left, top-right, bottom-left, bottom-right)
+SUBTILE_OFFSETS = ((0, 0), (1, 0), (0, 1), (1, 1))
+
+# HTTP status codes worth retrying (throttling and transient server errors)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_RETRIES = 5
+MAX_RETRY_DELAY = 60  # seconds
+
+
+def _create_session() -> requests.Session:
+    """Create a requests session that reuses connections and retries transient errors."""
+    retry = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=0.3,
+        status_forcelist=RETRY_STATUSES,
+        respect_retry_after_header=True
+    )
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# Shared session for synchronous downloads (keep-alive connections are reused)
+_SESSION = _create_session()
+
+
+class TileFile(NamedTuple):
+    """A stitched tile image on disk."""
+    name: str
+    path: str
 
 
 # ============================================================================
 # Utility Functions
 # ============================================================================
 
-def get_tiles_for_bbox(bounds: Tuple[float, float, float, float], zoom: int) -> List[mercantile.Tile]:
+def lnglat_to_tile_xy(lng: np.ndarray, lat: np.ndarray, zoom: int) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Get mercantile tiles for a bounding box at a given zoom level.
+    Get the x/y indices of the tiles containing arrays of points.
+
+    Vectorized version of `mercantile.tile` (same Web Mercator formula and
+    edge handling), so whole columns of coordinates are converted at once.
 
     Args:
-        bounds: Tuple of (min_lon, min_lat, max_lon, max_lat)
+        lng: Longitudes in decimal degrees
+        lat: Latitudes in decimal degrees (within Web Mercator limits)
         zoom: Zoom level for tiles
 
     Returns:
-        List of mercantile.Tile objects
+        Tuple of (x, y) integer arrays
     """
-    min_lon, min_lat, max_lon, max_lat = bounds
-    tiles = list(mercantile.tiles(min_lon, min_lat, max_lon, max_lat, zoom))
-    return tiles
+    z2 = 2 ** zoom
+    x = np.asarray(lng, dtype=float) / 360.0 + 0.5
+    sinlat = np.sin(np.radians(lat))
+    y = 0.5 - 0.25 * np.log((1.0 + sinlat) / (1.0 - sinlat)) / np.pi
+
+    # Points within EPSILON of a tile's right/bottom edge count in the next tile
+    xtile = np.clip(np.floor((x + mercantile.EPSILON) * z2), 0, z2 - 1).astype(np.int64)
+    ytile = np.clip(np.floor((y + mercantile.EPSILON) * z2), 0, z2 - 1).astype(np.int64)
+    return xtile, ytile
 
 
-def download_tile(tile: mercantile.Tile, tile_url: str) -> Optional[Image.Image]:
+def tile_xy_to_lnglat(x: np.ndarray, y: np.ndarray, zoom: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the longitude/latitude of the upper-left corner of arrays of tiles.
+
+    Vectorized version of `mercantile.ul`; pass x + 1 and y + 1 to get the
+    lower-right corners.
+
+    Args:
+        x: Tile x indices
+        y: Tile y indices
+        zoom: Zoom level of the tiles
+
+    Returns:
+        Tuple of (longitude, latitude) arrays in decimal degrees
+    """
+    z2 = 2 ** zoom
+    lng = np.asarray(x) / z2 * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * np.asarray(y) / z2))))
+    return lng, lat
+
+
+def get_tiles_for_bounds(bounds: np.ndarray, zoom: int) -> List[np.ndarray]:
+    """
+    Get the tiles covering many bounding boxes at a given zoom level.
+
+    Matches `mercantile.tiles` for each box (same clamping and tile order),
+    but computes every box's tile range in one pass of array math.
+
+    Args:
+        bounds: Array of shape (n, 4) with rows of (min_lon, min_lat, max_lon, max_lat)
+        zoom: Zoom level for tiles
+
+    Returns:
+        List of n integer arrays of shape (k, 2), one row of (x, y) per tile
+    """
+    bounds = np.asarray(bounds, dtype=float).reshape(-1, 4)
+    west = np.maximum(bounds[:, 0], -180.0)
+    south = np.maximum(bounds[:, 1], -85.051129)
+    east = np.minimum(bounds[:, 2], 180.0)
+    north = np.minimum(bounds[:, 3], 85.051129)
+
+    # Upper-left and lower-right tile of each box
+    x_min, y_min = lnglat_to_tile_xy(west, north, zoom)
+    x_max, y_max = lnglat_to_tile_xy(east - mercantile.LL_EPSILON, south + mercantile.LL_EPSILON, zoom)
+
+    # Enumerate every (x, y) in each range, x-major like mercantile.tiles
+    ny = y_max - y_min + 1
+    counts = (x_max - x_min + 1) * ny
+    box_idx = np.repeat(np.arange(len(bounds)), counts)
+    local_idx = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    xy = np.column_stack((
+        x_min[box_idx] + local_idx // ny[box_idx],
+        y_min[box_idx] + local_idx % ny[box_idx]
+    ))
+    return np.split(xy, np.cumsum(counts)[:-1])
+
+
+def decode_tile(data: bytes, tile: mercantile.Tile) -> Optional[np.ndarray]:
+    """
+    Decode downloaded tile bytes with OpenCV (libjpeg-turbo).
+
+    Args:
+        data: Encoded image bytes from the tile server
+        tile: Mercantile tile object (for error messages)
+
+    Returns:
+        BGR image array or None if the bytes cannot be decoded
+    """
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        logger.warning(f"Failed to decode tile {tile.x}, {tile.y}, {tile.z}")
+    return image
+
+
+def download_tile(tile: mercantile.Tile, tile_url: str) -> Optional[np.ndarray]:
     """
     Download a single tile from the tile server.
 
@@ -66,14 +213,14 @@ def download_tile(tile: mercantile.Tile, tile_url: str) -> Optional[Image.Image]
         tile_url: URL template for tile server
 
     Returns:
-        PIL Image object or None if download fails
+        BGR image array or None if download fails
     """
     url = tile_url.format(x=tile.x, y=tile.y, z=tile.z)
 
     try:
-        response = requests.get(url, stream=True, timeout=10)
+        response = _SESSION.get(url, timeout=10)
         if response.status_code == 200:
-            return Image.open(io.BytesIO(response.content))
+            return decode_tile(response.content, tile)
         else:
             logger.warning(f"Failed to download tile {tile.x}, {tile.y}, {tile.z}: HTTP {response.status_code}")
             return None
@@ -82,22 +229,318 @@ def download_tile(tile: mercantile.Tile, tile_url: str) -> Optional[Image.Image]
         return None
 
 
-def stitch_tiles(tiles: List[Optional[Image.Image]]) -> Image.Image:
+async def download_tile_async(
+    session: "aiohttp.ClientSession",
+    sem: asyncio.Semaphore,
+    tile: mercantile.Tile,
+    tile_url: str
+) -> Optional[np.ndarray]:
+    """
+    Download a single tile from the tile server without blocking other downloads.
+
+    Args:
+        session: Shared aiohttp session (keeps connections alive between requests)
+        sem: Semaphore bounding the number of requests in flight
+        tile: Mercantile tile object
+        tile_url: URL template for tile server
+
+    Returns:
+        BGR image array or None if download fails
+    """
+    url = tile_url.format(x=tile.x, y=tile.y, z=tile.z)
+
+    async with sem:
+        for attempt in range(MAX_RETRIES + 1):
+            retry_after = ""
+            try:
+                async with session.get(url) as response:
+                    if response.status == 200:
+                        return decode_tile(await response.read(), tile)
+                    if response.status not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                        logger.warning(f"Failed to download tile {tile.x}, {tile.y}, {tile.z}: HTTP {response.status}")
+                        return None
+                    # Honour the server's Retry-After on 429/503, like urllib3's Retry
+                    if response.status in (429, 503):
+                        retry_after = response.headers.get("Retry-After", "")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # Connection errors and timeouts are retried too, like urllib3's Retry
+                if attempt == MAX_RETRIES:
+                    logger.warning(f"Error downloading tile {tile.x}, {tile.y}, {tile.z}: {e}")
+                    return None
+            except Exception as e:
+                logger.warning(f"Error downloading tile {tile.x}, {tile.y}, {tile.z}: {e}")
+                return None
+
+            # The response is released by now. Back off while holding the
+            # semaphore so the whole pool slows down, but never longer than
+            # MAX_RETRY_DELAY, whatever Retry-After says
+            delay = float(retry_after) if retry_after.isdigit() else 0.3 * 2 ** attempt
+            await asyncio.sleep(min(delay, MAX_RETRY_DELAY))
+
+
+@contextmanager
+def open_tile_downloader(
+    tile_url: str,
+    workers: int = DEFAULT_WORKERS
+) -> Iterator[Callable[[List[mercantile.Tile]], Future]]:
+    """
+    Start a downloader that fetches tiles in the background.
+
+    Uses aiohttp when it is installed: one event loop thread and one pooled
+    session serve every request, so keep-alive connections are reused across
+    calls. Otherwise falls back to a thread pool sharing the pooled requests
+    session.
+
+    Args:
+        tile_url: URL template for tile server
+        workers: Maximum number of concurrent requests
+
+    Returns:
+        Context manager yielding a function that starts downloading a list of
+        tiles and returns a Future of a dict mapping each tile to its BGR image
+        array (or None if the download failed). Unfinished downloads are
+        cancelled on exit.
+    """
+    # Downloads still running (finished ones are dropped, with their images)
+    running = set()
+
+    def track(future: Future) -> Future:
+        running.add(future)
+        future.add_done_callback(running.discard)
+        return future
+
+    if aiohttp is None:
+        # Downloads are I/O wait, so threads scale well (requests releases the GIL)
+        logger.info("aiohttp not installed, downloading with a thread pool")
+        with ThreadPoolExecutor(max_workers=workers) as pool, ThreadPoolExecutor() as runner:
+            def download_all(tiles: List[mercantile.Tile]) -> Dict[mercantile.Tile, Optional[np.ndarray]]:
+                return dict(zip(tiles, pool.map(lambda tile: download_tile(tile, tile_url), tiles)))
+
+            def fetch(tiles: List[mercantile.Tile]) -> Future:
+                return track(runner.submit(download_all, tiles))
+
+            try:
+                yield fetch
+            finally:
+                for future in list(running):
+                    future.cancel()
+        return
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="tile-http", daemon=True)
+    thread.start()
+    sem = asyncio.Semaphore(workers)
+
+    async def open_session() -> "aiohttp.ClientSession":
+        connector = aiohttp.TCPConnector(limit=workers, limit_per_host=workers, keepalive_timeout=30)
+        return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=10))
+
+    session = asyncio.run_coroutine_threadsafe(open_session(), loop).result()
+
+    async def download_all(tiles: List[mercantile.Tile]) -> Dict[mercantile.Tile, Optional[np.ndarray]]:
+        images = await asyncio.gather(*(download_tile_async(session, sem, tile, tile_url) for tile in tiles))
+        return dict(zip(tiles, images))
+
+    def fetch(tiles: List[mercantile.Tile]) -> Future:
+        return track(asyncio.run_coroutine_threadsafe(download_all(tiles), loop))
+
+    try:
+        yield fetch
+    finally:
+        for future in list(running):
+            future.cancel()
+        asyncio.run_coroutine_threadsafe(session.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+def download_tiles(
+    tiles: List[mercantile.Tile],
+    tile_url: str,
+    workers: int = DEFAULT_WORKERS
+) -> Dict[mercantile.Tile, Optional[np.ndarray]]:
+    """
+    Download many tiles concurrently (see open_tile_downloader).
+
+    Args:
+        tiles: Mercantile tiles to fetch
+        tile_url: URL template for tile server
+        workers: Maximum number of concurrent requests
+
+    Returns:
+        Dict mapping each tile to its BGR image array (or None if the download failed)
+    """
+    if not tiles:
+        return {}
+    with open_tile_downloader(tile_url, workers) as fetch:
+        return fetch(tiles).result()
+
+
+def stitch_tiles(
+    top_left: Optional[np.ndarray],
+    top_right: Optional[np.ndarray],
+    bottom_left: Optional[np.ndarray],
+    bottom_right: Optional[np.ndarray]
+) -> np.ndarray:
     """
     Stitch four 256x256 tiles into a single 512x512 image.
 
+    Missing tiles (None) are left black.
+
     Args:
-        tiles: List of 4 PIL Image objects (or None)
+        top_left: BGR image array for the top-left quadrant (or None)
+        top_right: BGR image array for the top-right quadrant (or None)
+        bottom_left: BGR image array for the bottom-left quadrant (or None)
+        bottom_right: BGR image array for the bottom-right quadrant (or None)
 
     Returns:
-        Stitched 512x512 PIL Image
+        Stitched 512x512 BGR image array
+    """
+    # One preallocated buffer; each quadrant is a single slice copy
+    canvas = np.zeros((STITCHED_SIZE, STITCHED_SIZE, 3), dtype=np.uint8)
+    if top_left is not None:
+        canvas[:TILE_SIZE, :TILE_SIZE] = top_left
+    if top_right is not None:
+        canvas[:TILE_SIZE, TILE_SIZE:] = top_right
+    if bottom_left is not None:
+        canvas[TILE_SIZE:, :TILE_SIZE] = bottom_left
+    if bottom_right is not None:
+        canvas[TILE_SIZE:, TILE_SIZE:] = bottom_right
+    return canvas
+
+
+def write_tile(path: Path, image: np.ndarray) -> bool:
+    """
+    Encode an image as JPEG and write it to disk atomically.
+
+    Args:
+        path: Output file path
+        image: BGR image array
+
+    Returns:
+        True if the file was written
+    """
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    if not ok:
+        logger.warning(f"Failed to encode {path.name}")
+        return False
+
+    # Write to a temporary file and rename it into place, so an interrupted
+    # run never leaves a truncated tile that a resumed run would skip
+    part_path = path.with_name(path.name + ".part")
+    try:
+        part_path.write_bytes(encoded.tobytes())
+        os.replace(part_path, path)
+    except OSError as e:
+        logger.warning(f"Failed to write {path.name}: {e}")
+        return False
+    return True
+
+
+def configure_engine(engine: str) -> None:
     """
-    stitched = Image.new("RGB", (STITCHED_SIZE, STITCHED_SIZE))
-    for i, tile in enumerate(tiles):
-        if tile:
-            x, y = (i % 2) * TILE_SIZE, (i // 2) * TILE_SIZE
-            stitched.paste(tile, (x, y))
-    return stitched
+    Select the ONNX Runtime execution providers used by the inference SDK.
+
+    Must run before `inference` is imported, since the SDK reads the
+    setting at import time.
+
+    Args:
+        engine: One of ENGINE_PROVIDERS, or "auto" to keep the SDK default
+    """
+    if engine == "auto":
+        return
+    providers = ENGINE_PROVIDERS[engine]
+    os.environ["ONNXRUNTIME_EXECUTION_PROVIDERS"] = "[" + ",".join(providers) + "]"
+
+
+def batched(items: Iterable, batch_size: int) -> Iterator[List]:
+    """
+    Split an iterable into lists of at most batch_size items.
+
+    Args:
+        items: Items to split
+        batch_size: Maximum number of items per batch
+
+    Returns:
+        Iterator over lists of items
+    """
+    iterator = iter(items)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def read_images(tile_files: List[TileFile], futures: List[Future]) -> List[Tuple[TileFile, np.ndarray]]:
+    """
+    Collect a batch of decoded images, skipping any that could not be read.
+
+    Args:
+        tile_files: Tile files in the batch
+        futures: Matching futures returning the decoded image (or None)
+
+    Returns:
+        List of (tile file, BGR image array) tuples
+    """
+    images = []
+    for tile_file, future in zip(tile_files, futures):
+        image = future.result()
+        if image is None:
+            logger.warning(f"Failed to read {tile_file.name}")
+            continue
+        images.append((tile_file, image))
+    return images
+
+
+def prefetch_batches(
+    tile_files: Iterable[TileFile],
+    batch_size: int,
+    prefetch: int = PREFETCH_BATCHES
+) -> Iterator[List[Tuple[TileFile, np.ndarray]]]:
+    """
+    Yield batches of decoded images, reading upcoming batches in the background.
+
+    While the caller runs inference on one batch, a thread pool decodes the
+    next `prefetch` batches, one image per task (cv2 releases the GIL while
+    decoding, so the JPEGs of a batch decode in parallel across cores).
+
+    Args:
+        tile_files: Tile files to read (a list, or a stream of tiles as they are written)
+        batch_size: Maximum number of images per batch
+        prefetch: Number of batches to read ahead
+
+    Returns:
+        Iterator over lists of (tile file, BGR image array) tuples
+    """
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        pending = deque()
+        for batch_tiles in batched(tile_files, batch_size):
+            futures = [executor.submit(cv2.imread, tile_file.path) for tile_file in batch_tiles]
+            pending.append((batch_tiles, futures))
+            if len(pending) > prefetch:
+                yield read_images(*pending.popleft())
+        while pending:
+            yield read_images(*pending.popleft())
+
+
+def list_tile_images(tiles_dir: Path) -> List[TileFile]:
+    """
+    List the JPEG tiles in a directory, sorted by filename.
+
+    Uses a single `os.scandir` pass; each DirEntry already carries its name
+    and path, so nothing is re-derived per file later.
+
+    Args:
+        tiles_dir: Directory containing tile images
+
+    Returns:
+        List of tile files for the *.jpg files
+    """
+    with os.scandir(tiles_dir) as it:
+        tiles = [
+            TileFile(entry.name, entry.path) for entry in it
+            if entry.name.endswith(".jpg") and not entry.name.startswith(".") and entry.is_file()
+        ]
+    return sorted(tiles)
 
 
 # ============================================================================
@@ -122,7 +565,7 @@ def validate_geojson(geojson_path: str) -> gpd.GeoDataFrame:
         sys.exit(1)
 
     try:
-        gdf = gpd.read_file(geojson_path)
+        gdf = gpd.read_file(geojson_path, engine="pyogrio")
     except Exception as e:
         logger.error(f"Failed to read GeoJSON file: {e}")
         sys.exit(1)
@@ -140,7 +583,7 @@ def validate_geojson(geojson_path: str) -> gpd.GeoDataFrame:
         gdf = gdf.to_crs(epsg=4326)
 
     # Check for polygon geometries
-    if not all(gdf.geometry.geom_type.isin(['Polygon', 'MultiPolygon'])):
+    if not gdf.geometry.geom_type.isin(['Polygon', 'MultiPolygon']).all():
         logger.error("GeoJSON must contain only Polygon or MultiPolygon geometries")
         sys.exit(1)
 
@@ -175,7 +618,11 @@ def download_tiles_pipeline(
     zoom: int,
     output_dir: Path,
     output_name: str,
-    tile_url: str
+    tile_url: str,
+    workers: int = DEFAULT_WORKERS,
+    overwrite: bool = False,
+    tile_queue: Optional[queue.Queue] = None,
+    polygons: Optional[gpd.GeoDataFrame] = None
 ) -> Path:
     """
     Download and stitch satellite imagery tiles.
@@ -186,6 +633,12 @@ def download_tiles_pipeline(
         output_dir: Base output directory
         output_name: Name of output folder
         tile_url: Tile server URL template
+        workers: Maximum number of concurrent tile downloads
+        overwrite: Re-download tiles that already exist in the output folder
+        tile_queue: Optional queue that receives a TileFile for every tile as
+            soon as it is on disk (tiles kept from earlier runs first)
+        polygons: Polygons already loaded with validate_geojson (geojson_path
+            is then not read again)
 
     Returns:
         Path to tiles directory
@@ -195,16 +648,24 @@ def download_tiles_pipeline(
     logger.info("="*60)
 
     # Load and validate GeoJSON
-    logger.info(f"Loading GeoJSON from: {geojson_path}")
-    gdf = validate_geojson(geojson_path)
-    logger.info(f"Loaded {len(gdf)} polygon(s)")
+    if polygons is None:
+        logger.info(f"Loading GeoJSON from: {geojson_path}")
+        polygons = validate_geojson(geojson_path)
+    logger.info(f"Loaded {len(polygons)} polygon(s)")
 
     # Get tiles for each polygon
     logger.info(f"Calculating tiles at zoom level {zoom}...")
-    gdf["tiles"] = gdf["geometry"].apply(lambda geom: get_tiles_for_bbox(geom.bounds, zoom))
-
-    total_tiles = sum(len(row["tiles"]) for _, row in gdf.iterrows())
-    logger.info(f"Total tiles to download: {total_tiles}")
+    polygon_tiles = get_tiles_for_bounds(polygons.geometry.bounds.to_numpy(), zoom)
+
+    # Flatten to one (x, y) row per stitched tile. Overlapping polygons share
+    # tiles, so each tile is kept once (first occurrence, in polygon order).
+    all_tile_xy = np.concatenate(polygon_tiles)
+    _, first_idx = np.unique(all_tile_xy, axis=0, return_index=True)
+    tile_xy = all_tile_xy[np.sort(first_idx)]
+    total_tiles = len(tile_xy)
+    if len(all_tile_xy) > total_tiles:
+        logger.info(f"Skipping {len(all_tile_xy) - total_tiles} tile(s) shared between polygons")
+    logger.info(f"Total tiles: {total_tiles}")
 
     # Create output directories
     project_dir = output_dir / output_name
@@ -212,59 +673,187 @@ def download_tiles_pipeline(
     tiles_dir.mkdir(parents=True, exist_ok=True)
     logger.info(f"Output directory: {tiles_dir}")
 
-    # Download and stitch tiles
-    metadata_list = []
-    downloaded = 0
+    filenames = [f"{x}_{y}_{zoom}.jpg" for x, y in tile_xy.tolist()]
+
+    # Resume: tiles already on disk (from an earlier or interrupted run) are
+    # kept unless --overwrite is given. One directory listing replaces a
+    # stat per tile; partial writes never land under the final name.
+    if overwrite:
+        pending = np.arange(total_tiles)
+    else:
+        existing = set(os.listdir(tiles_dir))
+        pending = np.flatnonzero([filename not in existing for filename in filenames])
+        if len(pending) < total_tiles:
+            logger.info(f"Skipping {total_tiles - len(pending)} tile(s) already in {tiles_dir}")
+    pending_xy = tile_xy[pending]
+    pending_filenames = [filenames[i] for i in pending]
+    # Tiles on disk once the run ends; pending tiles are added as written
+    on_disk = np.ones(total_tiles, dtype=bool)
+    on_disk[pending] = False
+
+    if tile_queue is not None:
+        pending_set = set(pending.tolist())
+        for i, filename in enumerate(filenames):
+            if i not in pending_set:
+                tile_queue.put(TileFile(filename, str(tiles_dir / filename)))
+    logger.info(f"Total tiles to download: {len(pending)}")
+
+    # Download, stitch and write the tiles in chunks of DOWNLOAD_CHUNK_TILES,
+    # so the first tiles are on disk (and on tile_queue) while later chunks
+    # are still downloading. Neighbouring stitched images share subtiles, so
+    # each one is only requested once.
+    chunk_subtiles = [
+        [mercantile.Tile(x + dx, y + dy, zoom) for dx, dy in SUBTILE_OFFSETS]
+        for x, y in pending_xy.tolist()
+    ]
+    chunks = [
+        slice(start, start + DOWNLOAD_CHUNK_TILES)
+        for start in range(0, len(chunk_subtiles), DOWNLOAD_CHUNK_TILES)
+    ]
+    # How many of the remaining tiles still need each subtile; a subtile is
+    # dropped from memory once no remaining tile needs it
+    remaining_uses = Counter(subtile for subtiles in chunk_subtiles for subtile in subtiles)
+    total_subtiles = len(remaining_uses)
+    logger.info(f"Downloading {total_subtiles} subtiles ({workers} concurrent requests)...")
+
+    def stitch_and_write(filename: str, subtiles: List[Optional[np.ndarray]]) -> bool:
+        # A tile with a failed subtile is not written (rather than saved with a
+        # black quadrant), so running the same command again fetches it again
+        if any(subtile is None for subtile in subtiles):
+            logger.warning(f"Skipping {filename}: missing subtile(s), run again to retry")
+            return False
+        return write_tile(tiles_dir / filename, stitch_tiles(*subtiles))
 
-    logger.info("Downloading and stitching tiles...")
-    for poly_idx, row in gdf.iterrows():
-        for tile_idx, tile in enumerate(row["tiles"]):
-            # Download 4 subtiles for stitching
-            subtiles = [
-                download_tile(mercantile.Tile(tile.x, tile.y, tile.z), tile_url),
-                download_tile(mercantile.Tile(tile.x + 1, tile.y, tile.z), tile_url),
-                download_tile(mercantile.Tile(tile.x, tile.y + 1, tile.z), tile_url),
-                download_tile(mercantile.Tile(tile.x + 1, tile.y + 1, tile.z), tile_url)
-            ]
-
-            # Stitch tiles together
-            stitched = stitch_tiles(subtiles)
-            filename = f"{tile.x}_{tile.y}_{tile.z}.jpg"
-            stitched.save(tiles_dir / filename, "JPEG")
-
-            # Get bounding box of tile
-            tile_bounds = mercantile.bounds(tile)
-            tile_geom = box(tile_bounds.west, tile_bounds.south, tile_bounds.east, tile_bounds.north)
-
-            # Store metadata
-            metadata_list.append({
-                "filename": filename,
-                "geometry": tile_geom
+    downloaded = 0
+    processed = 0
+    total_pending = len(pending)
+    requested = set()
+    subtile_images: Dict[mercantile.Tile, Optional[np.ndarray]] = {}
+
+    with open_tile_downloader(tile_url, workers) as fetch:
+        def start_download(chunk: slice) -> Future:
+            missing = sorted({
+                subtile
+                for subtiles in chunk_subtiles[chunk]
+                for subtile in subtiles
+                if subtile not in requested
             })
-
-            downloaded += 1
-            # More frequent progress updates (every 5 tiles or at completion)
-            if downloaded % 5 == 0 or downloaded == total_tiles:
-                progress_pct = (downloaded * 100) // total_tiles if total_tiles > 0 else 0
-                progress_msg = f"Progress: {downloaded}/{total_tiles} tiles ({progress_pct}%)"
-                logger.info(progress_msg)
+            requested.update(missing)
+            return fetch(missing)
+
+        # Keep the next PREFETCH_CHUNKS chunks downloading while one is
+        # stitched and handed on, so the connections never sit idle
+        downloads = deque(start_download(chunk) for chunk in chunks[:PREFETCH_CHUNKS])
+
+        # JPEG encoding and file writes release the GIL, so a thread pool keeps
+        # every core busy instead of one write at a time
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            for i, chunk in enumerate(chunks):
+                subtile_images.update(downloads.popleft().result())
+                if i + PREFETCH_CHUNKS < len(chunks):
+                    downloads.append(start_download(chunks[i + PREFETCH_CHUNKS]))
+
+                # Look up the 4 subtiles of each tile (in SUBTILE_OFFSETS order)
+                chunk_filenames = pending_filenames[chunk]
+                chunk_images = [[subtile_images[subtile] for subtile in subtiles] for subtiles in chunk_subtiles[chunk]]
+                for subtiles in chunk_subtiles[chunk]:
+                    for subtile in subtiles:
+                        remaining_uses[subtile] -= 1
+                        if not remaining_uses[subtile]:
+                            del subtile_images[subtile]
+                results = executor.map(stitch_and_write, chunk_filenames, chunk_images)
+                for index, filename, written in zip(pending[chunk], chunk_filenames, results):
+                    processed += 1
+                    downloaded += written
+                    on_disk[index] = written
+                    if written and tile_queue is not None:
+                        tile_queue.put(TileFile(filename, str(tiles_dir / filename)))
+                    # More frequent progress updates (every 5 tiles or at completion)
+                    if processed % 5 == 0 or processed == total_pending:
+                        progress_pct = (processed * 100) // total_pending
+                        progress_msg = f"Progress: {processed}/{total_pending} tiles ({progress_pct}%)"
+                        logger.info(progress_msg)
+
+    # Metadata covers the tiles on disk: those written now and those kept
+    # from earlier runs, but not tiles skipped for a failed subtile.
+    # Corner coordinates come from the tile indices, then one vectorized box
+    # per tile
+    disk_xy = tile_xy[on_disk]
+    west, north = tile_xy_to_lnglat(disk_xy[:, 0], disk_xy[:, 1], zoom)
+    east, south = tile_xy_to_lnglat(disk_xy[:, 0] + 1, disk_xy[:, 1] + 1, zoom)
+    metadata_gdf = gpd.GeoDataFrame(
+        {"filename": [filenames[i] for i in np.flatnonzero(on_disk)]},
+        geometry=shapely.box(west, south, east, north),
+        crs="EPSG:4326"
+    )
 
     # Save metadata as GeoJSON
-    metadata_gdf = gpd.GeoDataFrame(metadata_list, crs="EPSG:4326")
     metadata_path = tiles_dir / "tile_metadata.geojson"
-    metadata_gdf.to_file(metadata_path, driver="GeoJSON")
+    metadata_gdf.to_file(metadata_path, driver="GeoJSON", engine="pyogrio")
     logger.info(f"Saved metadata to: {metadata_path}")
     logger.info(f"Downloaded {downloaded} tiles successfully")
+    if downloaded < total_pending:
+        logger.warning(
+            f"{total_pending - downloaded} tile(s) could not be downloaded; "
+            "run the same command again to retry them"
+        )
 
     return tiles_dir
 
 
+def stream_tiles_pipeline(**download_kwargs) -> Iterator[TileFile]:
+    """
+    Run the download pipeline in a background thread and stream its tiles.
+
+    Detection can start on the first tiles while the rest are still
+    downloading. The bounded queue applies backpressure, so downloads pause
+    when detection falls TILE_QUEUE_SIZE tiles behind.
+
+    Args:
+        **download_kwargs: Arguments for download_tiles_pipeline
+
+    Returns:
+        Iterator over tiles as they are written; re-raises any download
+        error once the tiles written before it have been consumed
+    """
+    # Validate the GeoJSON here, on the calling thread, so a bad file fails
+    # fast (before the detection model is loaded) instead of in the thread
+    logger.info(f"Loading GeoJSON from: {download_kwargs['geojson_path']}")
+    polygons = validate_geojson(download_kwargs["geojson_path"])
+
+    tile_queue = queue.Queue(maxsize=TILE_QUEUE_SIZE)
+    errors = []
+
+    def download() -> None:
+        try:
+            download_tiles_pipeline(tile_queue=tile_queue, polygons=polygons, **download_kwargs)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            tile_queue.put(None)
+
+    # Start now rather than on first iteration, so downloads overlap model loading
+    thread = threading.Thread(target=download, name="tile-download", daemon=True)
+    thread.start()
+
+    def tiles() -> Iterator[TileFile]:
+        yield from iter(tile_queue.get, None)
+        thread.join()
+        if errors:
+            raise errors[0]
+
+    return tiles()
+
+
 def run_detection_pipeline(
     tiles_dir: Path,
     detections_dir: Path,
     model_id: str,
     api_key: str,
-    confidence: float
+    confidence: float,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    engine: str = "auto",
+    tile_stream: Optional[Iterable[TileFile]] = None
 ) -> None:
     """
     Run object detection on downloaded tiles.
@@ -275,6 +864,10 @@ def run_detection_pipeline(
         model_id: Roboflow model identifier
         api_key: Roboflow API key
         confidence: Confidence threshold for detections
+        batch_size: Number of images sent to the model per inference call
+        engine: Inference engine (auto, cpu, cuda or tensorrt)
+        tile_stream: Tiles to process as they arrive (from stream_tiles_pipeline)
+            instead of listing tiles_dir up front
     """
     logger.info("="*60)
     logger.info("OBJECT DETECTION PIPELINE")
@@ -284,73 +877,97 @@ def run_detection_pipeline(
     detections_dir.mkdir(parents=True, exist_ok=True)
     logger.info(f"Output directory: {detections_dir}")
 
-    # Load model
+    # Load model (the inference SDK is imported here, after the engine is configured)
     logger.info(f"Loading Roboflow model: {model_id}")
+    logger.info(f"Inference engine: {engine}")
+    configure_engine(engine)
     try:
+        from inference import get_model
         model = get_model(model_id=model_id, api_key=api_key)
         logger.info("Model loaded successfully")
     except Exception as e:
         logger.error(f"Failed to load Roboflow model: {e}")
         sys.exit(1)
 
+    # Warm up with one dummy batch at the real batch size, so session setup
+    # (and the TensorRT engine build) happens before the first real batch
+    logger.info("Warming up model...")
+    try:
+        warmup_image = np.zeros((STITCHED_SIZE, STITCHED_SIZE, 3), dtype=np.uint8)
+        model.infer([warmup_image] * batch_size, confidence=confidence)
+    except Exception as e:
+        logger.warning(f"Model warm-up failed: {e}")
+
     # Find all tile images
-    tile_images = sorted(glob.glob(str(tiles_dir / "*.jpg")))
+    if tile_stream is None:
+        tile_images = list_tile_images(tiles_dir)
+
+        if not tile_images:
+            logger.warning(f"No tile images found in {tiles_dir}")
+            return
+
+        total = f"/{len(tile_images)}"
+        logger.info(f"Processing {len(tile_images)} images...")
+    else:
+        # Streaming from the download pipeline: the total is not known yet
+        tile_images = tile_stream
+        total = ""
+        logger.info("Processing images as they are downloaded...")
+    logger.info(f"Confidence threshold: {confidence}")
 
-    if not tile_images:
-        logger.warning(f"No tile images found in {tiles_dir}")
-        return
+    logger.info(f"Batch size: {batch_size}")
 
-    logger.info(f"Processing {len(tile_images)} images...")
-    logger.info(f"Confidence threshold: {confidence}")
+    # Create annotators once and reuse them for every image
+    bounding_box_annotator = sv.BoxAnnotator()
+    label_annotator = sv.LabelAnnotator()
 
-    # Process each image
+    # Process images in batches (one model call per batch keeps the accelerator busy)
     processed = 0
     total_detections = 0
 
-    for image_path in tile_images:
-        filename = os.path.basename(image_path)
+    # Upcoming batches are read from disk in the background during inference
+    for batch in prefetch_batches(tile_images, batch_size):
+        if not batch:
+            continue
 
+        # Run inference on the whole batch (returns one result per image)
         try:
-            # Read image
-            image = cv2.imread(image_path)
-            if image is None:
-                logger.warning(f"Failed to read {filename}")
-                continue
-
-            # Run inference
-            results = model.infer(image, confidence=confidence)[0]
+            batch_results = model.infer([image for _, image in batch], confidence=confidence)
+        except Exception as e:
+            logger.error(f"Error running inference on batch of {len(batch)} images: {e}")
+            continue
 
-            # Load results into supervision
-            detections = sv.Detections.from_inference(results)
+        for (tile_file, image), results in zip(batch, batch_results):
+            filename = tile_file.name
 
-            # Create annotators
-            bounding_box_annotator = sv.BoxAnnotator()
-            label_annotator = sv.LabelAnnotator()
+            try:
+                # Load results into supervision
+                detections = sv.Detections.from_inference(results)
 
-            # Annotate image
-            annotated_image = bounding_box_annotator.annotate(scene=image, detections=detections)
-            annotated_image = label_annotator.annotate(scene=annotated_image, detections=detections)
+                # Annotate image
+                annotated_image = bounding_box_annotator.annotate(scene=image, detections=detections)
+                annotated_image = label_annotator.annotate(scene=annotated_image, detections=detections)
 
-            # Save annotated image
-            output_path = detections_dir / filename
-            cv2.imwrite(str(output_path), annotated_image)
+                # Save annotated image
+                output_path = detections_dir / filename
+                cv2.imwrite(str(output_path), annotated_image)
 
-            processed += 1
-            num_detections = len(detections)
-            total_detections += num_detections
+                processed += 1
+                num_detections = len(detections)
+                total_detections += num_detections
 
-            # Show progress more frequently (every image with detections, or every 5 images)
-            if num_detections > 0 or processed % 5 == 0:
-                msg = f"[{processed}/{len(tile_images)}] {filename}"
-                if num_detections > 0:
-                    msg += f" - {num_detections} detection(s)"
-                logger.info(msg)
+                # Show progress more frequently (every image with detections, or every 5 images)
+                if num_detections > 0 or processed % 5 == 0:
+                    msg = f"[{processed}{total}] {filename}"
+                    if num_detections > 0:
+                        msg += f" - {num_detections} detection(s)"
+                    logger.info(msg)
 
-        except Exception as e:
-            logger.error(f"Error processing {filename}: {e}")
-            continue
+            except Exception as e:
+                logger.error(f"Error processing {filename}: {e}")
+                continue
 
-    logger.info(f"Processed {processed}/{len(tile_images)} images")
+    logger.info(f"Processed {processed}{total} images")
     logger.info(f"Total detections: {total_detections}")
     logger.info(f"Saved annotated images to: {detections_dir}")
 
@@ -409,6 +1026,19 @@ Examples:
         help='Tile server URL template (default: ArcGIS World Imagery)'
     )
 
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f'Number of concurrent tile downloads (default: {DEFAULT_WORKERS})'
+    )
+
+    parser.add_argument(
+        '--overwrite',
+        action='store_true',
+        help='Re-download tiles that already exist (default: skip them)'
+    )
+
     # Output arguments
     parser.add_argument(
         '--output-name',
@@ -432,6 +1062,20 @@ Examples:
         help='Detection confidence threshold (default: 0.05)'
     )
 
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f'Number of images per inference call (default: {DEFAULT_BATCH_SIZE})'
+    )
+
+    parser.add_argument(
+        '--engine',
+        choices=['auto'] + list(ENGINE_PROVIDERS),
+        default='auto',
+        help='Inference engine: ONNX Runtime on cpu, cuda or tensorrt (FP16) (default: auto)'
+    )
+
     parser.add_argument(
         '--roboflow-api-key',
         type=str,
@@ -456,6 +1100,10 @@ Examples:
     if args.mode in ['download', 'both']:
         if not args.geojson:
             parser.error("--geojson is required for download and both modes")
+    if args.workers < 1:
+        parser.error("--workers must be >= 1")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be >= 1")
 
     validate_detection_args(args)
 
@@ -494,30 +1142,41 @@ def main() -> None:
     logger.info(f"Mode: {args.mode}")
     logger.info(f"Output directory: {project_dir}")
 
+    download_kwargs = dict(
+        geojson_path=args.geojson,
+        zoom=args.zoom,
+        output_dir=output_dir,
+        output_name=args.output_name,
+        tile_url=args.tile_url,
+        workers=args.workers,
+        overwrite=args.overwrite
+    )
+    detection_kwargs = dict(
+        tiles_dir=tiles_dir,
+        detections_dir=detections_dir,
+        model_id=args.roboflow_model,
+        api_key=args.roboflow_api_key,
+        confidence=args.confidence,
+        batch_size=args.batch_size,
+        engine=args.engine
+    )
+
     # Execute based on mode
-    if args.mode in ['download', 'both']:
-        tiles_dir = download_tiles_pipeline(
-            geojson_path=args.geojson,
-            zoom=args.zoom,
-            output_dir=output_dir,
-            output_name=args.output_name,
-            tile_url=args.tile_url
-        )
+    if args.mode == 'both':
+        # Run both stages together: detection consumes tiles as they are written
+        run_detection_pipeline(tile_stream=stream_tiles_pipeline(**download_kwargs), **detection_kwargs)
 
-    if args.mode in ['detect', 'both']:
+    elif args.mode == 'download':
+        download_tiles_pipeline(**download_kwargs)
+
+    elif args.mode == 'detect':
         # Check if tiles directory exists
         if not tiles_dir.exists():
             logger.error(f"Tiles directory not found: {tiles_dir}")
             logger.error("Please run with --mode download first or check --output-name")
             sys.exit(1)
 
-        run_detection_pipeline(
-            tiles_dir=tiles_dir,
-            detections_dir=detections_dir,
-            model_id=args.roboflow_model,
-            api_key=args.roboflow_api_key,
-            confidence=args.confidence
-        )
+        run_detection_pipeline(**detection_kwargs)
 
     logger.info("="*60)
     logger.info("PIPELINE COMPLETE")
@@ -25,8 +25,11 @@ Data: Barcelona neighborhoods + manually created landmark points.
 from pathlib import Path
 import geopandas as gpd
 import matplotlib.pyplot as plt
-from shapely.geometry import Point
 import numpy as np
+import pandas as pd
+import shapely
+from pyproj import Transformer
+from spatial_utils import load_barris, use_file_backend
 
 try:
     BASE_DIR = Path(__file__).parent
@@ -36,8 +39,16 @@ DATA_DIR = BASE_DIR / "data"
 OUTPUT_DIR = BASE_DIR / "outputs"
 OUTPUT_DIR.mkdir(exist_ok=True)
 
-# Load neighborhoods
-barris = gpd.read_file(DATA_DIR / "barris.geojson")
+# Figures are saved to files, not shown (see spatial_utils.py)
+use_file_backend()
+
+# Load neighborhoods (cached as GeoParquet after the first run, see spatial_utils.py)
+barris = load_barris()
+
+# Coordinate transformers (building one is slow, so create each once and reuse it).
+# always_xy=True means (lon, lat) order in, (x, y) order out.
+WGS84_TO_UTM = Transformer.from_crs("EPSG:4326", "EPSG:25831", always_xy=True)
+WGS84_TO_MERCATOR = Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
 
 
 # --- Section 1: What is a CRS? ---
@@ -91,17 +102,22 @@ landmarks = {
     "Barceloneta Beach": (2.1899, 41.3783),
 }
 
-# Create a GeoDataFrame from the dictionary
-# Note: Point takes (x, y) = (longitude, latitude), NOT (lat, lon)!
+# Keep the raw coordinates as NumPy arrays: one value per landmark
+names = list(landmarks.keys())
+lons, lats = np.array(list(landmarks.values())).T
+
+# Create a GeoDataFrame from the coordinate arrays, indexed by landmark name
+# so a single landmark can be looked up directly: points.at[name, "geometry"]
+# Note: points use (x, y) = (longitude, latitude), NOT (lat, lon)!
 points = gpd.GeoDataFrame(
-    {"name": list(landmarks.keys())},
-    geometry=[Point(lon, lat) for lon, lat in landmarks.values()],
+    index=pd.Index(names, name="name"),
+    geometry=gpd.points_from_xy(lons, lats),
     crs="EPSG:4326",
 )
 
 print("\nLandmark points (WGS84):")
-for _, row in points.iterrows():
-    print(f"  {row['name']}: ({row.geometry.x:.4f}, {row.geometry.y:.4f})")
+for name, lon, lat in zip(names, lons, lats):
+    print(f"  {name}: ({lon:.4f}, {lat:.4f})")
 
 
 # --- Section 3: Reprojecting Data ---
@@ -112,18 +128,31 @@ print("=" * 60)
 
 # Reproject everything to UTM 31N for accurate measurements
 barris_utm = barris.to_crs(epsg=25831)
-points_utm = points.to_crs(epsg=25831)
+
+# For points we can transform the coordinate arrays directly: one call for
+# all landmarks, same result as points.to_crs(epsg=25831)
+x_utm, y_utm = WGS84_TO_UTM.transform(lons, lats)
+points_utm = gpd.GeoDataFrame(
+    index=points.index,
+    geometry=gpd.points_from_xy(x_utm, y_utm),
+    crs="EPSG:25831",
+)
 
 print("\nSagrada Familia coordinates in different CRS:")
-sf_4326 = points[points["name"] == "Sagrada Familia"].geometry.iloc[0]
-sf_utm = points_utm[points_utm["name"] == "Sagrada Familia"].geometry.iloc[0]
+sf_4326 = points.at["Sagrada Familia", "geometry"]
+sf_utm = points_utm.at["Sagrada Familia", "geometry"]
 
 print(f"  WGS84 (EPSG:4326): x={sf_4326.x:.6f}, y={sf_4326.y:.6f}  (degrees)")
 print(f"  UTM 31N (EPSG:25831): x={sf_utm.x:.2f}, y={sf_utm.y:.2f}  (meters)")
 
 # Also show Web Mercator for comparison
-points_mercator = points.to_crs(epsg=3857)
-sf_merc = points_mercator[points_mercator["name"] == "Sagrada Familia"].geometry.iloc[0]
+x_merc, y_merc = WGS84_TO_MERCATOR.transform(lons, lats)
+points_mercator = gpd.GeoDataFrame(
+    index=points.index,
+    geometry=gpd.points_from_xy(x_merc, y_merc),
+    crs="EPSG:3857",
+)
+sf_merc = points_mercator.at["Sagrada Familia", "geometry"]
 print(f"  Web Mercator (EPSG:3857): x={sf_merc.x:.2f}, y={sf_merc.y:.2f}  (pseudo-meters)")
 
 
@@ -133,25 +162,28 @@ print("\n" + "=" * 60)
 print("SECTION 4: Measuring Distances")
 print("=" * 60)
 
-# Distance from IAAC to each landmark
-iaac_utm = points_utm[points_utm["name"] == "IAAC (Pujades)"].geometry.iloc[0]
+# Distances between every pair of landmarks at once, using NumPy broadcasting:
+# x_utm[:, None] - x_utm is a (7, 7) table of x differences (same for y), and
+# hypot turns each (dx, dy) pair into a straight-line distance in meters
+dist_matrix = np.hypot(x_utm[:, None] - x_utm, y_utm[:, None] - y_utm)
+
+# Distance from IAAC to each landmark is one row of the table
+iaac_idx = names.index("IAAC (Pujades)")
+iaac_distances = dist_matrix[iaac_idx]
 
 print("\nDistances from IAAC (Pujades) to landmarks:")
-distances = []
-for _, row in points_utm.iterrows():
-    if row["name"] == "IAAC (Pujades)":
-        continue
-    dist_m = iaac_utm.distance(row.geometry)
-    distances.append({"name": row["name"], "distance_m": dist_m})
-    print(f"  {row['name']}: {dist_m:.0f} m ({dist_m/1000:.2f} km)")
+print("\n".join(
+    f"  {name}: {dist_m:.0f} m ({dist_m/1000:.2f} km)"
+    for name, dist_m in zip(names, iaac_distances)
+    if name != "IAAC (Pujades)"
+))
 
 # What if we made the MISTAKE of computing distance in WGS84?
 print("\nWARNING - Distance in WGS84 (WRONG!):")
-iaac_4326 = points[points["name"] == "IAAC (Pujades)"].geometry.iloc[0]
-sf_4326 = points[points["name"] == "Sagrada Familia"].geometry.iloc[0]
+iaac_4326 = points.at["IAAC (Pujades)", "geometry"]
 wrong_dist = iaac_4326.distance(sf_4326)
 print(f"  IAAC to Sagrada Familia: {wrong_dist:.6f} degrees (meaningless!)")
-print(f"  Correct distance: {iaac_utm.distance(points_utm[points_utm['name'] == 'Sagrada Familia'].geometry.iloc[0]):.0f} meters")
+print(f"  Correct distance: {dist_matrix[iaac_idx, names.index('Sagrada Familia')]:.0f} meters")
 
 
 # --- Section 5: CRS and Area Comparison ---
@@ -165,9 +197,10 @@ print("\nTotal Barcelona area by CRS:")
 
 barris_3857 = barris.to_crs(epsg=3857)
 
-area_4326 = barris.geometry.area.sum()
-area_utm = barris_utm.geometry.area.sum() / 1_000_000  # to km2
-area_3857 = barris_3857.geometry.area.sum() / 1_000_000  # to km2
+# shapely.area works on the whole array of geometries in one call
+area_4326 = shapely.area(barris.geometry.to_numpy()).sum()
+area_utm = shapely.area(barris_utm.geometry.to_numpy()).sum() / 1_000_000  # to km2
+area_3857 = shapely.area(barris_3857.geometry.to_numpy()).sum() / 1_000_000  # to km2
 
 print(f"  EPSG:4326: {area_4326:.6f} square degrees (not useful)")
 print(f"  EPSG:25831 (UTM): {area_utm:.2f} km2 (CORRECT)")
@@ -207,6 +240,7 @@ axes[2].set_ylabel("Y")
 plt.tight_layout()
 output_path = OUTPUT_DIR / "03_crs_comparison.png"
 plt.savefig(output_path, dpi=150, bbox_inches="tight")
+plt.close(fig)
 print(f"\nPlot saved to: {output_path}")
 
 # Plot landmarks on neighborhoods
@@ -214,9 +248,9 @@ fig, ax = plt.subplots(figsize=(10, 10))
 barris_utm.plot(ax=ax, edgecolor="gray", facecolor="lightyellow", linewidth=0.3)
 points_utm.plot(ax=ax, color="red", markersize=60, zorder=5, edgecolor="black", linewidth=0.5)
 
-# Label each point
-for _, row in points_utm.iterrows():
-    ax.annotate(row["name"], xy=(row.geometry.x, row.geometry.y),
+# Label each point (the UTM coordinates are already in x_utm, y_utm)
+for name, x, y in zip(names, x_utm, y_utm):
+    ax.annotate(name, xy=(x, y),
                 xytext=(5, 5), textcoords="offset points",
                 fontsize=8, fontweight="bold",
                 bbox=dict(boxstyle="round,pad=0.2", facecolor="white", alpha=0.8))
@@ -226,8 +260,8 @@ ax.set_axis_off()
 
 output_path = OUTPUT_DIR / "03_landmarks.png"
 plt.savefig(output_path, dpi=150, bbox_inches="tight")
+plt.close(fig)
 print(f"Plot saved to: {output_path}")
-plt.close("all")
 
 print("\n" + "=" * 60)
 print("DONE! You understand CRS and why it matters for measurements.")
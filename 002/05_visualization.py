@@ -16,7 +16,7 @@ Data: Barcelona neighborhoods + computed attributes.
 
 # --- Google Colab Setup ---
 # If running in Google Colab, uncomment and run these lines first:
-# !pip install geopandas folium mapclassify
+# !pip install geopandas pyogrio folium mapclassify
 # !git clone https://github.com/zacoppotamus/investigative-methodologies-26
 # %cd investigative-methodologies-26/002
 # ---
@@ -25,8 +25,15 @@ from pathlib import Path
 import geopandas as gpd
 import matplotlib.pyplot as plt
 import matplotlib.patheffects as pe
+from matplotlib.collections import PathCollection
 import numpy as np
+import shapely
 import folium
+from branca.colormap import StepColormap
+from branca.utilities import color_brewer
+from spatial_utils import (
+    load_barris, polygon_paths, to_geojson_string, use_file_backend,
+)
 
 try:
     BASE_DIR = Path(__file__).parent
@@ -36,15 +43,28 @@ DATA_DIR = BASE_DIR / "data"
 OUTPUT_DIR = BASE_DIR / "outputs"
 OUTPUT_DIR.mkdir(exist_ok=True)
 
-# Load data
-barris = gpd.read_file(DATA_DIR / "barris.geojson")
-districts = gpd.read_file(DATA_DIR / "districtes.geojson")
+# Figures are saved to files, not shown (see spatial_utils.py)
+use_file_backend()
+
+# Load data (neighborhoods are cached as GeoParquet after the first run, see spatial_utils.py)
+barris = load_barris(columns=["NOM", "DISTRICTE", "geometry"])
+# Districts are made of whole neighborhoods, so their shapes are dissolved
+# from barris below; from the districts file we only need the names
+district_names = gpd.read_file(
+    DATA_DIR / "districtes.geojson", columns=["DISTRICTE", "NOM"],
+    read_geometry=False, engine="pyogrio",  # read_geometry is a pyogrio option
+)
 
 # Compute area in metric CRS for choropleth data
-barris_utm = barris[["NOM", "DISTRICTE", "geometry"]].to_crs(epsg=25831)
-barris_utm["area_km2"] = barris_utm.geometry.area / 1_000_000
-barris_utm["perimeter_km"] = barris_utm.geometry.length / 1000
-barris_utm["compactness"] = (4 * np.pi * barris_utm.geometry.area) / (barris_utm.geometry.length ** 2)
+barris_utm = load_barris(epsg=25831, columns=["NOM", "DISTRICTE", "geometry"])
+
+# Area and perimeter are computed once for all geometries; the columns derive from them
+geoms = barris_utm.geometry.to_numpy()
+areas = shapely.area(geoms)
+perimeters = shapely.length(geoms)
+barris_utm["area_km2"] = areas / 1_000_000
+barris_utm["perimeter_km"] = perimeters / 1000
+barris_utm["compactness"] = (4 * np.pi * areas) / (perimeters ** 2)
 
 # Keep WGS84 version for Folium (needs lat/lon)
 barris_wgs = barris[["NOM", "DISTRICTE", "geometry"]].copy()
@@ -79,8 +99,8 @@ ax.set_axis_off()
 
 output_path = OUTPUT_DIR / "05_basic_choropleth.png"
 plt.savefig(output_path, dpi=150, bbox_inches="tight")
+plt.close(fig)
 print(f"Plot saved to: {output_path}")
-plt.close()
 
 
 # --- Section 2: Styled Choropleth with Labels ---
@@ -102,19 +122,24 @@ barris_utm.plot(
 )
 
 # Add district outlines
-districts_utm = districts[["NOM", "geometry"]].to_crs(epsg=25831)
+# Neighborhoods share edges but never overlap, so the fast "coverage" union works
+districts_utm = (
+    barris_utm[["DISTRICTE", "geometry"]]
+    .dissolve(by="DISTRICTE", as_index=False, method="coverage")
+    .merge(district_names, on="DISTRICTE")
+)
 districts_utm.boundary.plot(ax=ax, edgecolor="black", linewidth=2)
 
 # Label each neighborhood at its centroid
-for _, row in barris_utm.iterrows():
-    centroid = row.geometry.centroid
+# (all centroids are computed in one call, as an (N, 2) array of x/y)
+barri_xy = shapely.get_coordinates(shapely.centroid(barris_utm.geometry.to_numpy()))
+for (cx, cy), name in zip(barri_xy, barris_utm["NOM"]):
     # Shorten long names
-    name = row["NOM"]
     if len(name) > 20:
         name = name[:18] + "..."
     ax.annotate(
         name,
-        xy=(centroid.x, centroid.y),
+        xy=(cx, cy),
         ha="center", va="center",
         fontsize=5,
         fontweight="bold",
@@ -122,11 +147,11 @@ for _, row in barris_utm.iterrows():
     )
 
 # Label districts
-for _, row in districts_utm.iterrows():
-    centroid = row.geometry.centroid
+district_xy = shapely.get_coordinates(shapely.centroid(districts_utm.geometry.to_numpy()))
+for (cx, cy), name in zip(district_xy, districts_utm["NOM"]):
     ax.annotate(
-        row["NOM"],
-        xy=(centroid.x, centroid.y),
+        name,
+        xy=(cx, cy),
         ha="center", va="center",
         fontsize=9,
         fontweight="bold",
@@ -138,9 +163,9 @@ ax.set_title("Barcelona Districts and Neighborhoods", fontsize=16, fontweight="b
 ax.set_axis_off()
 
 output_path = OUTPUT_DIR / "05_labeled_map.png"
-plt.savefig(output_path, dpi=200, bbox_inches="tight")
+plt.savefig(output_path, dpi=150, bbox_inches="tight")
+plt.close(fig)
 print(f"Plot saved to: {output_path}")
-plt.close()
 
 
 # --- Section 3: Multi-Panel Figure ---
@@ -151,34 +176,34 @@ print("=" * 60)
 
 fig, axes = plt.subplots(1, 3, figsize=(20, 7))
 
-# Panel 1: Area
-barris_utm.plot(ax=axes[0], column="area_km2", cmap="YlOrRd", edgecolor="white",
-                linewidth=0.3, legend=True,
-                legend_kwds={"label": "km²", "shrink": 0.5})
-axes[0].set_title("Area", fontsize=14, fontweight="bold")
-axes[0].set_axis_off()
-
-# Panel 2: Perimeter
-barris_utm.plot(ax=axes[1], column="perimeter_km", cmap="Blues", edgecolor="white",
-                linewidth=0.3, legend=True,
-                legend_kwds={"label": "km", "shrink": 0.5})
-axes[1].set_title("Perimeter", fontsize=14, fontweight="bold")
-axes[1].set_axis_off()
-
-# Panel 3: Compactness
-barris_utm.plot(ax=axes[2], column="compactness", cmap="RdYlGn", edgecolor="white",
-                linewidth=0.3, legend=True,
-                legend_kwds={"label": "Ratio", "shrink": 0.5})
-axes[2].set_title("Compactness (1.0 = circle)", fontsize=14, fontweight="bold")
-axes[2].set_axis_off()
+# All three panels draw the same shapes, so convert them to matplotlib paths
+# once and give each panel its own collection colored by a different column
+# (barris_utm.plot() would convert every polygon again for each panel)
+barri_paths, barri_owner = polygon_paths(barris_utm.geometry.to_numpy())
+panels = [
+    # (column, colormap, legend label, title)
+    ("area_km2", "YlOrRd", "km²", "Area"),
+    ("perimeter_km", "Blues", "km", "Perimeter"),
+    ("compactness", "RdYlGn", "Ratio", "Compactness (1.0 = circle)"),
+]
+for ax, (column, cmap, label, title) in zip(axes, panels):
+    collection = PathCollection(barri_paths, cmap=cmap, edgecolor="white", linewidth=0.3)
+    # Multipolygon parts repeat the value of the neighborhood they belong to
+    collection.set_array(barris_utm[column].to_numpy()[barri_owner])
+    ax.add_collection(collection)
+    ax.autoscale_view()
+    ax.set_aspect("equal")
+    fig.colorbar(collection, ax=ax, label=label, shrink=0.5)
+    ax.set_title(title, fontsize=14, fontweight="bold")
+    ax.set_axis_off()
 
 plt.suptitle("Barcelona Neighborhood Metrics", fontsize=18, fontweight="bold", y=1.02)
 plt.tight_layout()
 
 output_path = OUTPUT_DIR / "05_multi_panel.png"
 plt.savefig(output_path, dpi=150, bbox_inches="tight")
+plt.close(fig)
 print(f"Plot saved to: {output_path}")
-plt.close()
 
 
 # --- Section 4: Classification Schemes ---
@@ -209,8 +234,8 @@ plt.tight_layout()
 
 output_path = OUTPUT_DIR / "05_classification.png"
 plt.savefig(output_path, dpi=150, bbox_inches="tight")
+plt.close(fig)
 print(f"Plot saved to: {output_path}")
-plt.close()
 
 
 # --- Section 5: Interactive Map with Folium ---
@@ -225,36 +250,55 @@ print("=" * 60)
 # Center the map on Barcelona
 bcn_center = [41.3874, 2.1686]
 
-m = folium.Map(location=bcn_center, zoom_start=13, tiles="cartodbpositron")
+# Folium writes every vertex into the HTML file. A tolerance of 1e-5 degrees
+# (about 1 m) drops the vertices that are too close together to see on a
+# web map, so the page is smaller and faster to load
+WEB_TOLERANCE = 1e-5
+barris_web = barris_wgs.assign(
+    geometry=shapely.simplify(barris_wgs.geometry.to_numpy(), WEB_TOLERANCE)
+)
 
-# Add a choropleth layer
-folium.Choropleth(
-    geo_data=barris_wgs.__geo_interface__,
-    data=barris_wgs,
-    columns=["NOM", "area_km2"],
-    key_on="feature.properties.NOM",
-    fill_color="YlOrRd",
-    fill_opacity=0.7,
-    line_opacity=0.5,
-    legend_name="Area (km²)",
-    name="Area Choropleth",
-).add_to(m)
+# Color each neighborhood by area, with the same 6 equal-width bins and
+# YlOrRd colors that folium.Choropleth would use. Storing the color as a
+# property lets one GeoJson layer do both the coloring and the tooltips,
+# so the polygons are written to the HTML only once.
+area_bins = np.histogram_bin_edges(barris_web["area_km2"], bins=6)
+area_colormap = StepColormap(
+    color_brewer("YlOrRd", n=6),
+    index=area_bins,
+    vmin=area_bins[0],
+    vmax=area_bins[-1],
+    caption="Area (km²)",
+)
+barris_web["_color"] = barris_web["area_km2"].map(area_colormap.rgb_hex_str)
+
+# Serialize the neighborhoods to GeoJSON once; every folium layer below
+# (in this section and the next) reuses the same string
+barris_geojson = to_geojson_string(
+    barris_web, ["NOM", "DISTRICTE", "area_km2", "compactness", "_color"]
+)
+
+m = folium.Map(location=bcn_center, zoom_start=13, tiles="cartodbpositron")
 
-# Add neighborhood names as tooltips using GeoJson
+# Add the choropleth layer, with neighborhood names as tooltips
 folium.GeoJson(
-    barris_wgs.__geo_interface__,
-    name="Neighborhoods",
-    style_function=lambda x: {
-        "fillOpacity": 0,
-        "color": "transparent",
-        "weight": 0,
+    barris_geojson,
+    name="Area Choropleth",
+    style_function=lambda feature: {
+        "fillColor": feature["properties"]["_color"],
+        "fillOpacity": 0.7,
+        "color": "black",
+        "opacity": 0.5,
+        "weight": 1,
     },
     tooltip=folium.GeoJsonTooltip(
         fields=["NOM", "DISTRICTE", "area_km2"],
         aliases=["Neighborhood:", "District:", "Area (km²):"],
         localize=True,
     ),
+    smooth_factor=2.0,  # let Leaflet simplify the outlines further while drawing
 ).add_to(m)
+area_colormap.add_to(m)  # legend
 
 # Add layer control
 folium.LayerControl().add_to(m)
@@ -276,7 +320,7 @@ m2 = folium.Map(location=bcn_center, zoom_start=13, tiles="cartodbpositron")
 # Layer 1: Neighborhoods
 neighborhood_layer = folium.FeatureGroup(name="Neighborhoods")
 folium.GeoJson(
-    barris_wgs.__geo_interface__,
+    barris_geojson,
     style_function=lambda x: {
         "fillColor": "#3388ff",
         "fillOpacity": 0.1,
@@ -287,11 +331,18 @@ folium.GeoJson(
 ).add_to(neighborhood_layer)
 neighborhood_layer.add_to(m2)
 
-# Layer 2: Districts (thicker borders)
-districts_wgs = districts[["NOM", "geometry"]].copy()
+# Layer 2: Districts (thicker borders), simplified like the neighborhoods
+districts_wgs = (
+    barris_wgs[["DISTRICTE", "geometry"]]
+    .dissolve(by="DISTRICTE", as_index=False, method="coverage")
+    .merge(district_names, on="DISTRICTE")
+)
+districts_web = districts_wgs.assign(
+    geometry=shapely.simplify(districts_wgs.geometry.to_numpy(), WEB_TOLERANCE)
+)
 district_layer = folium.FeatureGroup(name="Districts")
 folium.GeoJson(
-    districts_wgs.__geo_interface__,
+    to_geojson_string(districts_web, ["NOM"]),
     style_function=lambda x: {
         "fillOpacity": 0,
         "color": "red",
@@ -303,7 +354,7 @@ district_layer.add_to(m2)
 
 # Layer 3: Compactness choropleth (added directly to map -- Choropleth requires Map parent)
 folium.Choropleth(
-    geo_data=barris_wgs.__geo_interface__,
+    geo_data=barris_geojson,
     data=barris_wgs,
     columns=["NOM", "compactness"],
     key_on="feature.properties.NOM",
@@ -322,8 +373,6 @@ output_path = OUTPUT_DIR / "05_multi_layer_map.html"
 m2.save(str(output_path))
 print(f"Multi-layer map saved to: {output_path}")
 
-plt.close("all")
-
 print("\n" + "=" * 60)
 print("DONE! You've created static and interactive visualizations.")
 print("Next: 06_capstone_analysis.py")
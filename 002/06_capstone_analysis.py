@@ -16,7 +16,8 @@ Analysis:
 5. Calculate % coverage per neighborhood
 6. Produce a ranked choropleth map (static + interactive)
 
-NOTE: This script requires internet access to download OSM data.
+NOTE: The first run requires internet access to download OSM data
+(later runs read it from the cache in data/, see spatial_utils.py).
 """
 
 # --- Google Colab Setup ---
@@ -29,11 +30,16 @@ NOTE: This script requires internet access to download OSM data.
 from pathlib import Path
 import geopandas as gpd
 import matplotlib.pyplot as plt
-import matplotlib.patheffects as pe
 import numpy as np
 import osmnx as ox
+import shapely
 import folium
 import warnings
+from pyproj import Transformer
+from spatial_utils import (
+    cached_osm, intersection_area, load_barris, parallel_to_crs, to_geojson_string,
+    use_file_backend,
+)
 
 warnings.filterwarnings("ignore", category=FutureWarning)
 
@@ -45,8 +51,19 @@ DATA_DIR = BASE_DIR / "data"
 OUTPUT_DIR = BASE_DIR / "outputs"
 OUTPUT_DIR.mkdir(exist_ok=True)
 
+# Figures are saved to files, not shown (see spatial_utils.py)
+use_file_backend()
+
 BCN_PLACE = "Barcelona, Spain"
 
+# Keep osmnx's own HTTP cache (raw Overpass responses) next to the data
+ox.settings.cache_folder = DATA_DIR / "osm_cache"
+ox.settings.use_cache = True
+ox.settings.requests_timeout = 180
+
+# OSM data comes in WGS84; (lon, lat) in, UTM 31N (x, y) out
+WGS84_TO_UTM = Transformer.from_crs("EPSG:4326", "EPSG:25831", always_xy=True)
+
 
 # --- Section 1: Load Base Data ---
 
@@ -55,9 +72,10 @@ print("CAPSTONE: Which neighborhoods have the best walkability?")
 print("=" * 60)
 
 print("\nLoading neighborhood boundaries...")
-barris = gpd.read_file(DATA_DIR / "barris.geojson")
-barris = barris[["NOM", "DISTRICTE", "geometry"]].copy()
-barris_utm = barris.to_crs(epsg=25831)
+# Both CRS are cached as GeoParquet after the first run (see spatial_utils.py):
+# UTM for the analysis, WGS84 for the folium map in Section 7
+barris = load_barris(columns=["NOM", "DISTRICTE", "geometry"])
+barris_utm = load_barris(epsg=25831, columns=["NOM", "DISTRICTE", "geometry"])
 barris_utm["area_m2"] = barris_utm.geometry.area
 print(f"  Loaded {len(barris)} neighborhoods")
 
@@ -68,18 +86,26 @@ print("\n" + "=" * 60)
 print("SECTION 2: Downloading OSM Data")
 print("=" * 60)
 
+# cached_osm saves each download in data/osm_<name>.parquet (shared with
+# script 04), so only the first run hits the network (see spatial_utils.py)
 print("\nDownloading metro stations...")
-metro = ox.features_from_place(BCN_PLACE, tags={"railway": "station", "station": "subway"})
-metro = metro[metro.geometry.type == "Point"].copy()
-metro = metro[["name", "geometry"]].reset_index(drop=True)
-metro_utm = metro.to_crs(epsg=25831)
+metro = cached_osm("metro", BCN_PLACE, tags={"railway": "station", "station": "subway"})
+# Keep only points (get_type_id gives each geometry's type as a number)
+metro_types = shapely.get_type_id(metro.geometry.to_numpy())
+metro = metro[metro_types == shapely.GeometryType.POINT].reset_index(drop=True)
+# Points need no geometry rebuilding: transform their x/y arrays in one call
+xy = shapely.get_coordinates(metro.geometry.to_numpy())
+x_utm, y_utm = WGS84_TO_UTM.transform(xy[:, 0], xy[:, 1])
+metro_utm = metro.set_geometry(gpd.points_from_xy(x_utm, y_utm, crs="EPSG:25831"))
 print(f"  Found {len(metro_utm)} metro stations")
 
 print("\nDownloading parks...")
-parks = ox.features_from_place(BCN_PLACE, tags={"leisure": "park"})
-parks = parks[parks.geometry.type.isin(["Polygon", "MultiPolygon"])].copy()
-parks = parks[["name", "geometry"]].reset_index(drop=True)
-parks_utm = parks.to_crs(epsg=25831)
+parks = cached_osm("parks", BCN_PLACE, tags={"leisure": "park"})
+# Keep only polygons (parks can also be tagged as points/lines)
+park_types = shapely.get_type_id(parks.geometry.to_numpy())
+is_polygon = (park_types == shapely.GeometryType.POLYGON) | (park_types == shapely.GeometryType.MULTIPOLYGON)
+parks = parks[is_polygon].reset_index(drop=True)
+parks_utm = parallel_to_crs(parks, 25831)
 print(f"  Found {len(parks_utm)} parks")
 
 
@@ -89,21 +115,20 @@ print("\n" + "=" * 60)
 print("SECTION 3: Creating Buffers")
 print("=" * 60)
 
+# Each coverage area is the union of many buffers. Buffering the merged
+# geometry gives the same area as merging the individual buffers, and lets
+# GEOS skip the expensive union of hundreds of overlapping circles.
+# (quad_segs=16 segments per quarter circle, like GeoSeries.buffer())
+
 # 400m buffer around metro stations (~5 minute walk)
 METRO_BUFFER_M = 400
-metro_buffers = metro_utm.copy()
-metro_buffers["geometry"] = metro_utm.geometry.buffer(METRO_BUFFER_M)
+metro_coverage = shapely.MultiPoint(metro_utm.geometry.to_numpy()).buffer(METRO_BUFFER_M, quad_segs=16)
 print(f"  Created {METRO_BUFFER_M}m buffers around metro stations")
 
-# 50m buffer around parks (park-adjacent zone)
+# 50m buffer around parks (park-adjacent zone): merge overlapping parks first
 PARK_BUFFER_M = 50
-park_buffers = parks_utm.copy()
-park_buffers["geometry"] = parks_utm.geometry.buffer(PARK_BUFFER_M)
+park_coverage = shapely.union_all(parks_utm.geometry.to_numpy()).buffer(PARK_BUFFER_M, quad_segs=16)
 print(f"  Created {PARK_BUFFER_M}m buffers around parks")
-
-# Merge all buffers into single geometries
-metro_coverage = metro_buffers.geometry.union_all()
-park_coverage = park_buffers.geometry.union_all()
 print("  Merged individual buffers into unified coverage areas")
 
 
@@ -119,18 +144,27 @@ walkable_green = metro_coverage.intersection(park_coverage)
 print(f"  Combined coverage type: {walkable_green.geom_type}")
 print(f"  Combined coverage area: {walkable_green.area / 1_000_000:.2f} km2")
 
-# Also compute individual coverages for comparison
-bcn_outline = barris_utm.geometry.union_all()
-bcn_area = bcn_outline.area
-
-metro_in_bcn = metro_coverage.intersection(bcn_outline)
-park_in_bcn = park_coverage.intersection(bcn_outline)
-walkable_in_bcn = walkable_green.intersection(bcn_outline)
+# Also compute individual coverages for comparison. The neighborhoods tile
+# the city without overlapping, so the part of a coverage inside Barcelona
+# is the sum of its parts inside each neighborhood. intersection_area()
+# clips all neighborhoods at once, using a spatial index so each one is only
+# intersected with the coverage parts that reach it (see spatial_utils.py).
+# These per-neighborhood areas are reused for the scores in Section 5.
+barri_geoms = barris_utm.geometry.to_numpy()
+# Prepare the neighborhoods once (builds their internal index) so the
+# "intersects" tests of all three coverages below can reuse it
+shapely.prepare(barri_geoms)
+barri_area = barris_utm["area_m2"]
+bcn_area = barri_area.sum()
+
+metro_area = intersection_area(barri_geoms, metro_coverage)
+park_area = intersection_area(barri_geoms, park_coverage)
+walkable_area = intersection_area(barri_geoms, walkable_green)
 
 print(f"\n  Barcelona total area: {bcn_area / 1_000_000:.2f} km2")
-print(f"  Metro coverage (400m): {metro_in_bcn.area / bcn_area * 100:.1f}%")
-print(f"  Park coverage (50m): {park_in_bcn.area / bcn_area * 100:.1f}%")
-print(f"  Both (walkable + green): {walkable_in_bcn.area / bcn_area * 100:.1f}%")
+print(f"  Metro coverage (400m): {metro_area.sum() / bcn_area * 100:.1f}%")
+print(f"  Park coverage (50m): {park_area.sum() / bcn_area * 100:.1f}%")
+print(f"  Both (walkable + green): {walkable_area.sum() / bcn_area * 100:.1f}%")
 
 
 # --- Section 5: Calculate Per-Neighborhood Scores ---
@@ -140,55 +174,47 @@ print("SECTION 5: Neighborhood Walkability Scores")
 print("=" * 60)
 
 # For each neighborhood, compute what % is covered by the walkable+green zone
-results = []
-for _, row in barris_utm.iterrows():
-    barri_geom = row.geometry
-    barri_area = barri_geom.area
-
-    # Metro coverage in this neighborhood
-    metro_clip = metro_coverage.intersection(barri_geom)
-    metro_pct = (metro_clip.area / barri_area) * 100
-
-    # Park coverage in this neighborhood
-    park_clip = park_coverage.intersection(barri_geom)
-    park_pct = (park_clip.area / barri_area) * 100
-
-    # Combined: walkable + green
-    combined_clip = walkable_green.intersection(barri_geom)
-    combined_pct = (combined_clip.area / barri_area) * 100
-
-    results.append({
-        "NOM": row["NOM"],
-        "DISTRICTE": row["DISTRICTE"],
-        "area_km2": barri_area / 1_000_000,
-        "metro_pct": metro_pct,
-        "park_pct": park_pct,
-        "walkable_green_pct": combined_pct,
-    })
-
-# Create results DataFrame and merge with geometry
-import pandas as pd
-results_df = pd.DataFrame(results)
-barris_results = barris_utm.merge(results_df, on=["NOM", "DISTRICTE"])
+# (the covered areas were computed in Section 4).
+
+# Metro coverage in each neighborhood
+metro_pct = metro_area / barri_area * 100
+
+# Park coverage in each neighborhood
+park_pct = park_area / barri_area * 100
+
+# Combined: walkable + green
+combined_pct = walkable_area / barri_area * 100
+
+# The scores are in the same order as barris_utm, so add them as new columns
+barris_results = barris_utm.assign(
+    area_km2=barri_area / 1_000_000,
+    metro_pct=metro_pct,
+    park_pct=park_pct,
+    walkable_green_pct=combined_pct,
+)
 
 # Print top 15
 print("\nTop 15 Neighborhoods by Walkable + Green Coverage:")
 print("-" * 65)
-top15 = results_df.sort_values("walkable_green_pct", ascending=False).head(15)
-for i, (_, row) in enumerate(top15.iterrows(), 1):
-    print(f"  {i:2d}. {row['NOM']:<30s} {row['walkable_green_pct']:5.1f}%  "
-          f"(metro: {row['metro_pct']:4.1f}%, parks: {row['park_pct']:4.1f}%)")
+top15 = barris_results.nlargest(15, "walkable_green_pct")
+print("\n".join(
+    f"  {i:2d}. {row.NOM:<30s} {row.walkable_green_pct:5.1f}%  "
+    f"(metro: {row.metro_pct:4.1f}%, parks: {row.park_pct:4.1f}%)"
+    for i, row in enumerate(top15.itertuples(), 1)
+))
 
 print("\nBottom 5 Neighborhoods:")
 print("-" * 65)
-bottom5 = results_df.sort_values("walkable_green_pct").head(5)
-for i, (_, row) in enumerate(bottom5.iterrows(), 1):
-    print(f"  {i:2d}. {row['NOM']:<30s} {row['walkable_green_pct']:5.1f}%  "
-          f"(metro: {row['metro_pct']:4.1f}%, parks: {row['park_pct']:4.1f}%)")
+bottom5 = barris_results.nsmallest(5, "walkable_green_pct")
+print("\n".join(
+    f"  {i:2d}. {row.NOM:<30s} {row.walkable_green_pct:5.1f}%  "
+    f"(metro: {row.metro_pct:4.1f}%, parks: {row.park_pct:4.1f}%)"
+    for i, row in enumerate(bottom5.itertuples(), 1)
+))
 
 # Average
-avg_score = results_df["walkable_green_pct"].mean()
-median_score = results_df["walkable_green_pct"].median()
+avg_score = barris_results["walkable_green_pct"].mean()
+median_score = barris_results["walkable_green_pct"].median()
 print(f"\n  Average walkability score: {avg_score:.1f}%")
 print(f"  Median walkability score: {median_score:.1f}%")
 
@@ -240,15 +266,15 @@ barris_results.plot(ax=ax, column="walkable_green_pct", cmap="RdYlGn",
                                  "shrink": 0.4, "orientation": "horizontal", "pad": 0.02})
 
 # Label neighborhoods with their score
-for _, row in barris_results.iterrows():
-    centroid = row.geometry.centroid
-    score = row["walkable_green_pct"]
+# (all centroids are computed in one call, as an (N, 2) array of x/y)
+barri_xy = shapely.get_coordinates(shapely.centroid(barris_results.geometry.to_numpy()))
+for (cx, cy), score in zip(barri_xy, barris_results["walkable_green_pct"]):
     ax.annotate(
         f"{score:.0f}%",
-        xy=(centroid.x, centroid.y),
+        xy=(cx, cy),
         ha="center", va="center",
         fontsize=6, fontweight="bold",
-        path_effects=[pe.withStroke(linewidth=2, foreground="white")],
+        bbox=dict(boxstyle="round,pad=0.1", fc="white", ec="none", alpha=0.7),
     )
 
 ax.set_title("Barcelona Walkability: % Near Metro AND Parks",
@@ -256,7 +282,7 @@ ax.set_title("Barcelona Walkability: % Near Metro AND Parks",
 ax.set_axis_off()
 
 output_path = OUTPUT_DIR / "06_walkability_labeled.png"
-plt.savefig(output_path, dpi=200, bbox_inches="tight")
+plt.savefig(output_path, dpi=150, bbox_inches="tight")
 print(f"Plot saved to: {output_path}")
 plt.close("all")
 
@@ -267,17 +293,40 @@ print("\n" + "=" * 60)
 print("SECTION 7: Interactive Folium Map")
 print("=" * 60)
 
-# Prepare WGS84 data for Folium
-barris_wgs = barris_results.to_crs(epsg=4326)
-metro_wgs = metro_utm.to_crs(epsg=4326)
-parks_wgs = parks_utm.to_crs(epsg=4326)
+# Prepare WGS84 data for Folium. All layers were loaded in WGS84, so use
+# those originals instead of projecting the UTM copies back: the scores are
+# in the same neighborhood order, so they can be added as columns.
+barris_wgs = barris.assign(
+    metro_pct=metro_pct,
+    park_pct=park_pct,
+    walkable_green_pct=combined_pct,
+)
+metro_wgs = metro
+parks_wgs = parks
+
+# Folium writes every vertex into the HTML file. A tolerance of 1e-5 degrees
+# (about 1 m) drops the vertices that are too close together to see on a
+# web map, so the page is smaller and faster to load
+WEB_TOLERANCE = 1e-5
+barris_web = barris_wgs.assign(
+    geometry=shapely.simplify(barris_wgs.geometry.to_numpy(), WEB_TOLERANCE)
+)
+parks_web = parks_wgs.assign(
+    geometry=shapely.simplify(parks_wgs.geometry.to_numpy(), WEB_TOLERANCE)
+)
+
+# Serialize the neighborhoods to GeoJSON once, with only the columns the
+# map uses; the choropleth and the tooltip layer share the same string
+barris_geojson = to_geojson_string(
+    barris_web, ["NOM", "DISTRICTE", "walkable_green_pct", "metro_pct", "park_pct"]
+)
 
 bcn_center = [41.3874, 2.1686]
 m = folium.Map(location=bcn_center, zoom_start=13, tiles="cartodbpositron")
 
 # Walkability choropleth
 folium.Choropleth(
-    geo_data=barris_wgs.__geo_interface__,
+    geo_data=barris_geojson,
     data=barris_wgs,
     columns=["NOM", "walkable_green_pct"],
     key_on="feature.properties.NOM",
@@ -290,7 +339,7 @@ folium.Choropleth(
 
 # Tooltips with details
 folium.GeoJson(
-    barris_wgs.__geo_interface__,
+    barris_geojson,
     name="Details",
     style_function=lambda x: {"fillOpacity": 0, "color": "transparent", "weight": 0},
     tooltip=folium.GeoJsonTooltip(
@@ -300,26 +349,20 @@ folium.GeoJson(
     ),
 ).add_to(m)
 
-# Metro stations as markers
+# Metro stations as markers: one GeoJson layer draws a circle marker per
+# point, so all stations are written to the HTML as a single data array
 metro_layer = folium.FeatureGroup(name="Metro Stations")
-for _, row in metro_wgs.iterrows():
-    station_name = row.get("name", "Metro Station")
-    if pd.isna(station_name):
-        station_name = "Metro Station"
-    folium.CircleMarker(
-        location=[row.geometry.y, row.geometry.x],
-        radius=5,
-        color="blue",
-        fill=True,
-        fill_opacity=0.8,
-        popup=station_name,
-    ).add_to(metro_layer)
+folium.GeoJson(
+    to_geojson_string(metro_wgs.fillna({"name": "Metro Station"}), ["name"]),
+    marker=folium.CircleMarker(radius=5, color="blue", fill=True, fill_opacity=0.8),
+    popup=folium.GeoJsonPopup(fields=["name"], labels=False),
+).add_to(metro_layer)
 metro_layer.add_to(m)
 
 # Parks
 park_layer = folium.FeatureGroup(name="Parks", show=False)
 folium.GeoJson(
-    parks_wgs.__geo_interface__,
+    to_geojson_string(parks_web, ["name"]),
     style_function=lambda x: {
         "fillColor": "green",
         "fillOpacity": 0.4,
@@ -364,8 +407,10 @@ City-wide:
 Top 3 most walkable neighborhoods:
 """)
 
-for i, (_, row) in enumerate(top15.head(3).iterrows(), 1):
-    print(f"  {i}. {row['NOM']} ({row['walkable_green_pct']:.1f}%)")
+print("\n".join(
+    f"  {i}. {row.NOM} ({row.walkable_green_pct:.1f}%)"
+    for i, row in enumerate(top15.head(3).itertuples(), 1)
+))
 
 print(f"""
 Outputs:
@@ -0,0 +1,231 @@
+"""
+Module 002 - Shared helpers
+===========================
+
+Small utilities shared by the Module 002 scripts, so each script can focus
+on the concept it teaches.
+
+- load_barris(): Barcelona neighborhoods in any CRS, cached as GeoParquet
+- cached_osm(): OpenStreetMap features, downloaded once and cached as GeoParquet
+- parallel_to_crs(): to_crs() that reprojects coordinates on several threads
+- intersection_area(): area of each geometry inside a (large) coverage area
+- polygon_paths(): (multi)polygons as matplotlib Paths, for reusable plots
+- to_geojson_string(): GeoDataFrame as a GeoJSON string, e.g. for folium
+- use_file_backend(): matplotlib set up for saving figures to files
+
+Import from a script in this folder with:
+    from spatial_utils import load_barris
+"""
+
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+import geopandas as gpd
+import matplotlib
+import numpy as np
+import shapely
+from matplotlib.path import Path as MplPath
+from pyproj import CRS, Transformer
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+def load_barris(epsg=4326, columns=None):
+    """
+    Load the Barcelona neighborhoods in the given CRS.
+
+    The first call reads barris.geojson, reprojects it and saves the result
+    as data/barris_<epsg>.parquet. Later calls read that GeoParquet file
+    instead: a binary columnar format that loads much faster than GeoJSON
+    text and skips the reprojection. The cache is rebuilt whenever
+    barris.geojson is newer than it.
+
+    Args:
+        epsg: EPSG code of the CRS to return (default: 4326, WGS84)
+        columns: Optional list of columns to load (include "geometry")
+
+    Returns:
+        GeoDataFrame of neighborhoods
+    """
+    source = DATA_DIR / "barris.geojson"
+    cache = DATA_DIR / f"barris_{epsg}.parquet"
+
+    if cache.exists() and cache.stat().st_mtime >= source.stat().st_mtime:
+        # GeoParquet stores the CRS as PROJJSON; restore the short EPSG form
+        barris = gpd.read_parquet(cache, columns=columns)
+        return barris.set_crs(epsg=epsg, allow_override=True)
+
+    barris = gpd.read_file(source)
+    if barris.crs.to_epsg() != epsg:
+        barris = parallel_to_crs(barris, epsg)
+    barris.to_parquet(cache)
+    return barris if columns is None else barris[columns]
+
+
+def cached_osm(name, place, tags):
+    """
+    Download OpenStreetMap features with osmnx, caching them as GeoParquet.
+
+    The first call runs ox.features_from_place(place, tags) and saves the
+    "name" and geometry columns to data/osm_<name>.parquet. Later calls read
+    that file and skip the network entirely. Delete the file to download
+    fresh data.
+
+    Args:
+        name: Short name for the cache file (e.g. "parks")
+        place: Place to query (e.g. "Barcelona, Spain")
+        tags: OSM tags to download (e.g. {"leisure": "park"})
+
+    Returns:
+        GeoDataFrame with "name" and geometry columns, in EPSG:4326
+    """
+    cache = DATA_DIR / f"osm_{name}.parquet"
+    if cache.exists():
+        return gpd.read_parquet(cache).set_crs(epsg=4326, allow_override=True)
+
+    import osmnx as ox  # only needed the first time, and only by some scripts
+
+    features = ox.features_from_place(place, tags=tags)
+    features = features[["name", "geometry"]].reset_index(drop=True)
+    features.to_parquet(cache)
+    return features
+
+
+@lru_cache(maxsize=None)
+def _get_transformer(source_crs, epsg):
+    """Build (once) the Transformer from source_crs to the given EPSG code."""
+    return Transformer.from_crs(source_crs, CRS.from_epsg(epsg), always_xy=True)
+
+
+def parallel_to_crs(gdf, epsg, max_workers=8):
+    """
+    Reproject a GeoDataFrame like gdf.to_crs(epsg=...), using several threads.
+
+    All vertices are pulled out of the geometries into one (N, 2) array,
+    split into max_workers chunks and transformed in parallel (pyproj
+    releases the GIL while it transforms). The new coordinates are then
+    written back into copies of the original geometries.
+
+    Args:
+        gdf: GeoDataFrame with a CRS set
+        epsg: EPSG code of the target CRS
+        max_workers: Number of threads to use (default: 8)
+
+    Returns:
+        New GeoDataFrame in the target CRS
+    """
+    transformer = _get_transformer(gdf.crs, epsg)
+    geoms = gdf.geometry.to_numpy()
+    coords = shapely.get_coordinates(geoms)
+
+    def transform_chunk(chunk):
+        return np.column_stack(transformer.transform(chunk[:, 0], chunk[:, 1]))
+
+    chunks = np.array_split(coords, max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        projected = np.concatenate(list(pool.map(transform_chunk, chunks)))
+
+    # set_coordinates() fills the array in place, so work on a copy
+    new_geoms = shapely.set_coordinates(geoms.copy(), projected)
+    return gdf.set_geometry(gpd.GeoSeries(new_geoms, index=gdf.index, crs=epsg))
+
+
+def intersection_area(geoms, coverage):
+    """
+    Area of each geometry that falls inside a coverage area.
+
+    Same result as shapely.area(shapely.intersection(geoms, coverage)), but
+    faster when coverage is a large union of many separate parts (e.g. all
+    metro buffers merged). An STRtree over those parts finds the few that
+    can touch each geometry, and only those pairs are intersected. Parts of
+    a union never overlap, so their clipped areas can simply be added up.
+
+    Args:
+        geoms: Array of geometries (e.g. neighborhoods)
+        coverage: Polygon/MultiPolygon whose parts do not overlap
+            (e.g. the result of union_all() or of intersecting two unions)
+
+    Returns:
+        Array with the covered area of each geometry (0 if none)
+    """
+    parts = shapely.get_parts(coverage)
+    geom_idx, part_idx = shapely.STRtree(parts).query(geoms, predicate="intersects")
+    areas = shapely.area(shapely.intersection(geoms[geom_idx], parts[part_idx]))
+    return np.bincount(geom_idx, weights=areas, minlength=len(geoms))
+
+
+def polygon_paths(geoms):
+    """
+    Convert an array of (multi)polygons into matplotlib Paths.
+
+    GeoDataFrame.plot() redoes this conversion on every call. Building the
+    paths once lets several plots of the same shapes share them, e.g. in a
+    matplotlib PathCollection colored with set_array().
+
+    Args:
+        geoms: Array of Polygon/MultiPolygon geometries
+
+    Returns:
+        (paths, owner): one Path per polygon part (holes included), and for
+        each path the position in geoms of the geometry it comes from
+    """
+    geom_type, coords, offsets = shapely.to_ragged_array(geoms)
+    ring_offsets, polygon_offsets = offsets[0], offsets[1]
+    if geom_type == shapely.GeometryType.MULTIPOLYGON:
+        parts_per_geom = np.diff(offsets[2])
+    else:
+        parts_per_geom = np.ones(len(geoms), dtype=int)
+    owner = np.repeat(np.arange(len(geoms)), parts_per_geom)
+
+    paths = []
+    for first_ring, end_ring in zip(polygon_offsets[:-1], polygon_offsets[1:]):
+        start, end = ring_offsets[first_ring], ring_offsets[end_ring]
+        # The rings of a polygon are contiguous: start a new sub-path at each ring
+        codes = np.full(end - start, MplPath.LINETO, dtype=MplPath.code_type)
+        codes[ring_offsets[first_ring:end_ring] - start] = MplPath.MOVETO
+        paths.append(MplPath(coords[start:end], codes))
+    return paths, owner
+
+
+def to_geojson_string(gdf, columns):
+    """
+    Serialize a GeoDataFrame to a GeoJSON FeatureCollection string.
+
+    Geometries are written by GEOS in one vectorized call (shapely.to_geojson)
+    instead of building a Python dict per feature like __geo_interface__.
+    Folium accepts the string anywhere it accepts GeoJSON, so a map with
+    several layers of the same data can serialize it only once.
+
+    Args:
+        gdf: GeoDataFrame in EPSG:4326
+        columns: Columns to include as feature properties
+
+    Returns:
+        GeoJSON string
+    """
+    geometries = shapely.to_geojson(gdf.geometry.to_numpy())
+    # Missing values (NaN/None) become null, as NaN is not valid JSON
+    values = gdf[columns].astype(object)
+    properties = values.where(values.notna(), None).to_dict("records")
+    features = ",".join(
+        f'{{"type":"Feature","properties":{json.dumps(props)},"geometry":{geometry}}}'
+        for props, geometry in zip(properties, geometries)
+    )
+    return f'{{"type":"FeatureCollection","features":[{features}]}}'
+
+
+def use_file_backend():
+    """
+    Set up matplotlib for scripts that save their figures to files.
+
+    Run as a script, figures are never shown, so use the non-interactive Agg
+    backend. In a notebook (Jupyter, Colab) the inline backend is kept so
+    figures still appear. Agg draws long paths in chunks of 10,000 vertices,
+    which keeps its memory use bounded. The scripts close each figure right
+    after saving it, so only one is held in memory at a time.
+    """
+    if "ipykernel" not in sys.modules:
+        matplotlib.use("Agg")
+    matplotlib.rcParams["agg.path.chunksize"] = 10000